@@ -9,22 +9,49 @@ Kanata over a persistent TCP connection.
 """
 
 import argparse
+import functools
 import json
 import logging
 import os
 import re
 import socket
+import struct
 import subprocess
 import sys
 import tempfile
 import threading
+import time
 from queue import Empty, Queue
-from typing import Any, ClassVar, NoReturn
+from typing import Any, Callable, ClassVar, NoReturn
 
 import tomllib
 from gi.repository import GLib
 from pydbus import SessionBus
 
+# Optional: google-re2 matches [[app]] rules in linear time (DFA, no
+# backtracking). Falls back to the stdlib re module if not installed.
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+# Optional: orjson (de)serializes the Kanata JSON protocol several times faster
+# than the stdlib json module, and encodes straight to bytes.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    json_dumps = orjson.dumps
+    json_loads = orjson.loads
+else:
+
+    def json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+    json_loads = json.loads
+
 # Command line defaults.
 DEFAULT_CONFIG_FILE = "config.toml"
 DEFAULT_KANATA_HOST = "127.0.0.1"
@@ -54,16 +81,6 @@ DEFAULT_HELP_WINDOW_SCRIPT = os.path.join(
 # Directory containing help markdown files, named <app>_<keys>.md
 DEFAULT_HELP_FILES_DIR = os.path.expanduser("~/.local/share/kwanata/help")
 
-# The dbus message that will be received has several lines with the format:
-#    field1: value
-#    field2: value
-#    ...
-# (see FIELD_XXXX constants for the possible fields)
-DBUS_MSG_FIELD_RE = re.compile(r"^\s*(\w+):\s*(.*)$")
-
-# Used as default for omitted rule fields — matches anything, acting as a wildcard.
-MATCH_ALL_RE = re.compile(r".*")
-
 # Toml file sections and fields. Also used for dbus messages, except for FIELD_VK
 # that appears in the toml as the result of a name/class/caption match.
 SECTION_APP = "app"
@@ -73,6 +90,20 @@ FIELD_CAPTION = "caption"
 FIELD_VK = "virtual_keys"
 FIELD_LAYER = "layer"
 
+# Keys sent in the KWin scripts' dbus messages. parse_dbus_msg stores each
+# value under the key object from here (not a freshly parsed string), so
+# lookups like info[FIELD_NAME] hit on identity.
+DBUS_MSG_KEYS = {
+    key: key for key in ("pid", FIELD_NAME, FIELD_CLASS, FIELD_CAPTION, "success")
+}
+
+# A rule field without any of these is a plain substring, matched with `in`.
+REGEX_METACHARS = frozenset(".^$*+?{}[]\\|()")
+
+# Unescaped \w \W \d \D \b \B \s \S. These are Unicode-aware in re but
+# ASCII-only in re2, so patterns using them are never handed to re2.
+UNICODE_CLASS_RE = re.compile(r"(?<!\\)(?:\\\\)*\\[wWdDbBsS]")
+
 # Possible values for kanata's virtual key actions.
 KANATA_VIRTUAL_KEY_ACTIONS = {"Press", "Release", "Tap", "Toggle"}
 
@@ -80,6 +111,11 @@ KANATA_IGNORED_MESSAGES = ["TapActivated", "HoldActivated"]
 KANATA_MESSAGE_PUSH = "MessagePush"
 KANATA_LAYER_CHANGE = "LayerChange"
 
+# Pre-encoded Kanata requests that never change, sent as is (see KanataClient.send).
+KANATA_REQUEST_CURRENT_LAYER_NAME = b'{"RequestCurrentLayerName":{}}\n'
+KANATA_REQUEST_CURRENT_LAYER_INFO = b'{"RequestCurrentLayerInfo":{}}\n'
+KANATA_REQUEST_LAYER_NAMES = b'{"RequestLayerNames":{}}\n'
+
 # Config section for run-or-raise entries.
 SECTION_RUN_OR_RAISE = "run_or_raise"
 
@@ -141,6 +177,9 @@ class Variables:
 # utils
 # ----------------------------
 class utils:
+    # (path, mtime_ns, size) of the last parsed TOML file and its contents.
+    _toml_cache: ClassVar[tuple[tuple[str, int, int], dict[str, Any]] | None] = None
+
     @staticmethod
     def fatal(message: str, *args: object) -> NoReturn:
         """Log an error message and exit the program."""
@@ -152,6 +191,27 @@ class utils:
         """Check if a string is empty/whitespace only."""
         return not s.strip()
 
+    @staticmethod
+    def load_toml(filepath: str) -> dict[str, Any]:
+        """Parse a TOML file, reusing the last result if the file is unchanged.
+
+        AppMatcher and AppRunner both load the same config file (on startup
+        and on every reload), so only the first of them actually parses it.
+        Raises OSError / tomllib.TOMLDecodeError like tomllib.load().
+        """
+        with open(filepath, "rb") as f:
+            # fstat the open file, so the cache key and the bytes read always
+            # belong to the same file (no stat/open race with an editor).
+            st = os.fstat(f.fileno())
+            key = (os.path.abspath(filepath), st.st_mtime_ns, st.st_size)
+            cached = utils._toml_cache
+            if cached is not None and cached[0] == key:
+                return cached[1]
+            raw = f.read()
+        data = tomllib.loads(raw.decode("utf-8"))
+        utils._toml_cache = (key, data)
+        return data
+
     @staticmethod
     def validate_port(port: int | str) -> tuple[str, int]:
         """Validate a port number or an IP:PORT combination and return (host, port)."""
@@ -179,22 +239,24 @@ class utils:
 
     @staticmethod
     def _is_valid_ip_port(value: str) -> bool:
-        pattern = r"(\d{1,3}(?:\.\d{1,3}){3}):(\d{1,5})"
-        match = re.fullmatch(pattern, value)
-        if not match:
+        ip, sep, port_str = value.rpartition(":")
+        if not sep or not utils._is_ascii_digits(port_str, max_len=5):
             return False
 
-        ip, port_str = match.groups()
-        port = int(port_str)
-
-        if not utils._is_valid_port(port):
+        if not utils._is_valid_port(int(port_str)):
             return False
 
         if ip == "localhost":
             return True
 
         octets = ip.split(".")
-        return all(o.isdigit() and 0 <= int(o) <= 255 for o in octets)
+        return len(octets) == 4 and all(
+            utils._is_ascii_digits(o, max_len=3) and int(o) <= 255 for o in octets
+        )
+
+    @staticmethod
+    def _is_ascii_digits(s: str, max_len: int) -> bool:
+        return 0 < len(s) <= max_len and s.isascii() and s.isdigit()
 
     @staticmethod
     def validate_fake_key(
@@ -216,20 +278,64 @@ class utils:
 
         return name, action
 
+    @staticmethod
+    def required_literal(pattern: str) -> str:
+        """Return the longest literal substring any match of pattern must contain.
+
+        Only literal runs at the top level of the pattern are considered
+        (alternations, groups and repeats break a run), so the result is safe
+        to use as a cheap `literal in text` rejection test before running the
+        regex. Returns "" if there is no such literal (or the pattern is case
+        insensitive).
+
+        Relies on re's private parser modules; if they're ever gone, it just
+        returns "" (the pre-check is optional).
+        """
+        try:
+            from re import _constants as sre_constants
+            from re import _parser as sre_parse
+        except ImportError:
+            return ""
+        try:
+            parsed = sre_parse.parse(pattern)
+        except re.error:
+            return ""
+        if parsed.state.flags & re.IGNORECASE:
+            return ""
+
+        longest, run = "", []
+        for op, av in parsed:
+            if op == sre_constants.LITERAL:
+                run.append(chr(av))
+                continue
+            if len(run) > len(longest):
+                longest = "".join(run)
+            run = []
+        if len(run) > len(longest):
+            longest = "".join(run)
+        return longest
+
     @staticmethod
     def parse_dbus_msg(text: str) -> dict[str, str]:
         """
         It returns a dictionary with this keys: pid, name, class, caption
+        (or class, caption, success for a raise result).
+
+        The dbus message has several lines with the format:
+           field1: value
+           field2: value
+           ...
+        (see DBUS_MSG_KEYS for the possible fields; other lines are ignored).
+        Plain string operations split them; a regex is not needed for this
+        format.
         """
         result = {}
-
         for line in text.splitlines():
-            m = DBUS_MSG_FIELD_RE.match(line)
-            if not m:
-                continue
-            k, v = m.groups()
-            result[k.strip()] = v.strip()
-
+            key, sep, value = line.partition(":")
+            if sep:
+                key = DBUS_MSG_KEYS.get(key.strip())
+                if key is not None:
+                    result[key] = value.strip()
         return result
 
 
@@ -334,8 +440,7 @@ class AppRunner:
     def load_config(self, filepath):
         self._entries = {}
         try:
-            with open(filepath, "rb") as f:
-                data = tomllib.load(f)
+            data = utils.load_toml(filepath)
             for entry in data.get(SECTION_RUN_OR_RAISE, []):
                 name = entry.get("name")
                 if not name:
@@ -635,9 +740,25 @@ class HelpWindowManager:
 class KanataClient:
     """TCP client for communicating with kanata."""
 
+    # Timeout in seconds waiting for a command response from Kanata.
+    RESPONSE_TIMEOUT = 2
+    # Timeout in seconds for a write to Kanata (SO_SNDTIMEO), so sendall
+    # can't block the main loop forever if Kanata stops reading.
+    SEND_TIMEOUT = 2
+    # Timeout in seconds for connecting to Kanata (runs on the main loop).
+    CONNECT_TIMEOUT = 0.25
+    # Seconds between attempts to reconnect after losing the connection to
+    # Kanata (e.g. while it restarts). Retried for as long as it takes.
+    RECONNECT_INTERVAL = 1
+    # TCP keepalive: first probe after KEEPIDLE idle seconds, then every
+    # KEEPINTVL seconds, dropping the connection after KEEPCNT failures.
+    KEEPIDLE = 30
+    KEEPINTVL = 10
+    KEEPCNT = 3
+
     def __init__(self, addr: tuple[str, int]):
         self.addr = addr
-        self._client: socket.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._client: socket.socket | None = None
         self._connected = False
         self._running = False
         self._response_queue: Queue[str] = Queue()
@@ -648,7 +769,13 @@ class KanataClient:
         self._on_set_callback = None
         self._on_unset_callback = None
         self._on_layer_change_callback = None
+        self._on_reconnect_callback = None
+        # GLib source id of the _reconnect timer (0: not scheduled).
+        self._reconnect_source = 0
         self.current_layer: str | None = None
+        # Encoded ChangeLayer command per layer name. Layers come from a small
+        # fixed set (config rules + default layer), so each is encoded once.
+        self._change_layer_cmds: dict[str, bytes] = {}
 
     def set_app_callback(self, callback):
         """Set callback for APP: push messages. Called with app name as argument."""
@@ -669,6 +796,13 @@ class KanataClient:
         after self.current_layer has already been updated."""
         self._on_layer_change_callback = callback
 
+    def set_reconnect_callback(self, callback):
+        """Set callback for a re-established connection to Kanata (e.g. after
+        it restarted, losing its layer and virtual key state). Called with no
+        arguments, from within the _reconnect timer (while still connecting),
+        once current_layer has been seeded again."""
+        self._on_reconnect_callback = callback
+
     def set_set_callback(self, callback):
         """Set callback for SET: push messages. Called with the raw name
         (e.g. "verbose" or "!verbose")."""
@@ -679,27 +813,28 @@ class KanataClient:
         (e.g. "verbose" or "!verbose")."""
         self._on_unset_callback = callback
 
-    def _connect(self):
-        """Connect to Kanata's TCP server. Lazy-called on first send()."""
+    def _connect(self) -> bool:
+        """Connect to Kanata's TCP server. Lazy-called on first send().
+
+        Failing the first connection is fatal (Kanata must be running). After
+        a lost connection, it's called again by the _reconnect timer, and
+        then just returns False while Kanata is unreachable (e.g. while it
+        restarts).
+        """
+        reconnecting = self._client is not None
+        if reconnecting:
+            self._close_socket()
         log.debug("KWanata: Connecting to %s:%s", *self.addr)
+        self._client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         try:
+            self._client.settimeout(self.CONNECT_TIMEOUT)
             self._client.connect(self.addr)
-            # Disable Nagle's algorithm for low-latency command delivery.
-            self._client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-            self._connected = True
-            self._running = True
-
-            # Start background reader thread.
-            self._reader_thread = threading.Thread(
-                target=self._reader_loop, daemon=True
-            )
-            self._reader_thread.start()
-
-            # Kanata errors if a client connects and disconnects without sending
-            # anything, so issue a harmless query to satisfy that requirement.
-            self.get_current_layer_name()
-
+            self._client.settimeout(None)
         except OSError as e:
+            self._client.close()
+            if reconnecting:
+                log.debug("Kanata is still unreachable: %s", e)
+                return False
             ip, port = self.addr
             utils.fatal(
                 "Kanata connection error: %s — make sure kanata is running with the -p option "
@@ -710,46 +845,145 @@ class KanataClient:
                 port,
             )
 
+        # Disable Nagle's algorithm for low-latency command delivery.
+        self._client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._quickack()
+        self._keepalive()
+        # Bound writes only: the reader must keep blocking in recv with no
+        # timeout (see _reader_loop), so settimeout() can't be used here.
+        self._client.setsockopt(
+            socket.SOL_SOCKET,
+            socket.SO_SNDTIMEO,
+            struct.pack("ll", self.SEND_TIMEOUT, 0),
+        )
+        self._connected = True
+        self._running = True
+
+        # Start background reader thread.
+        self._reader_thread = threading.Thread(target=self._reader_loop, daemon=True)
+        self._reader_thread.start()
+
+        # Kanata errors if a client connects and disconnects without sending
+        # anything, so issue a harmless query to satisfy that requirement.
+        # It also seeds current_layer, later kept up to date locally.
+        self.current_layer = self.get_current_layer_name()
+
+        if reconnecting and self._connected:
+            log.info("Reconnected to Kanata at %s:%s", *self.addr)
+            if self._on_reconnect_callback:
+                self._on_reconnect_callback()
+        return self._connected
+
+    def _connection_lost(self):
+        """Mark the connection as lost and keep trying to reconnect from the
+        main loop until Kanata is back (see _reconnect), so the state of the
+        focused window can be re-applied without waiting for a new event."""
+        self._connected = False
+        # Layer changes are no longer being followed, so the locally tracked
+        # layer can't be trusted by change_layer anymore.
+        self.current_layer = None
+        if not self._reconnect_source:
+            self._reconnect_source = GLib.timeout_add_seconds(
+                self.RECONNECT_INTERVAL, self._reconnect
+            )
+
+    def _reconnect(self):
+        """GLib timeout: try to reconnect, until it succeeds."""
+        if self._connected or self._connect():
+            self._reconnect_source = 0
+            return GLib.SOURCE_REMOVE
+        return GLib.SOURCE_CONTINUE
+
+    def _quickack(self):
+        """Ask Linux to ACK incoming data immediately instead of delaying it
+        (up to 40ms). The kernel clears TCP_QUICKACK on its own, so the
+        reader re-arms it after each recv. No-op where unsupported."""
+        if hasattr(socket, "TCP_QUICKACK"):
+            self._client.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+
+    def _keepalive(self):
+        """Enable TCP keepalive, so a connection dropped without a FIN/RST
+        (e.g. Kanata's host went away) is detected by the kernel instead of
+        leaving sends to pile up on a dead socket. The tuning options are
+        Linux-specific and skipped where unsupported."""
+        self._client.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        for option, value in (
+            ("TCP_KEEPIDLE", self.KEEPIDLE),
+            ("TCP_KEEPINTVL", self.KEEPINTVL),
+            ("TCP_KEEPCNT", self.KEEPCNT),
+        ):
+            if hasattr(socket, option):
+                self._client.setsockopt(
+                    socket.IPPROTO_TCP, getattr(socket, option), value
+                )
+
     def close(self):
         """Close the client socket connection gracefully."""
-        self._running = False
+        if self._reconnect_source:
+            GLib.source_remove(self._reconnect_source)
+            self._reconnect_source = 0
         if self._client:
             log.warning("Closing client socket to %s", self.addr)
+        self._close_socket()
+        self._client = None
+
+    def _close_socket(self):
+        """Close the socket and wait for the reader thread to finish."""
+        self._running = False
+        self._connected = False
+        if self._client:
             try:
                 self._client.shutdown(socket.SHUT_RDWR)
             except OSError:
                 pass  # Socket may already be closed or unconnected
             self._client.close()
-        if hasattr(self, "_reader_thread"):
-            self._reader_thread.join(timeout=2)
+        reader = getattr(self, "_reader_thread", None)
+        if reader is not None and reader is not threading.current_thread():
+            reader.join(timeout=2)
 
     def _reader_loop(self):
         """Background thread: read from socket, dispatch lines."""
-        buffer = ""
-        self._client.settimeout(0.5)
+        # Bytes are received into a reusable chunk and accumulated in a
+        # bytearray; only complete lines are decoded (which also keeps a
+        # multi-byte UTF-8 character split across two reads intact).
+        buffer = bytearray()
+        chunk = bytearray(4096)
+        chunk_view = memoryview(chunk)
+        # The socket stays in blocking mode (no timeout): an idle reader
+        # sleeps in recv instead of waking up periodically, and sendall
+        # doesn't poll before every write (it's bounded by SO_SNDTIMEO
+        # instead). close() wakes recv up via shutdown().
         while self._running:
             try:
-                chunk = self._client.recv(4096)
-                if not chunk:
-                    log.warning("Kanata closed the connection")
+                n = self._client.recv_into(chunk)
+                if not n:
+                    if self._running:
+                        log.warning("Kanata closed the connection")
                     break
-                buffer += chunk.decode("utf-8")
-                while "\n" in buffer:
-                    line, buffer = buffer.split("\n", 1)
-                    line = line.strip()
+                self._quickack()
+                buffer += chunk_view[:n]
+                start = 0
+                end = buffer.find(b"\n")
+                while end != -1:
+                    line = buffer[start:end].decode("utf-8", "replace").strip()
                     if line:
                         self._process_incoming_line(line)
-            except TimeoutError:
-                continue
+                    start = end + 1
+                    end = buffer.find(b"\n", start)
+                del buffer[:start]
             except OSError:
                 if self._running:
                     log.warning("Socket error in reader thread")
                 break
+        # Unless close() stopped it, the connection was lost (e.g. Kanata
+        # restarted).
+        if self._running:
+            self._connection_lost()
 
     def _process_incoming_line(self, line: str):
         """Route an incoming JSON line to the right handler."""
         try:
-            data = json.loads(line)
+            data = json_loads(line)
         except json.JSONDecodeError:
             log.warning("Non-JSON line from Kanata: %s", line)
             return
@@ -766,13 +1000,13 @@ class KanataClient:
         # Ignore some kanta messages to avoid cluttering.
         if any(msg in data for msg in KANATA_IGNORED_MESSAGES):
             return
-        log.debug(f"Kanata: {line}")
+        log.debug("Kanata: %s", line)
         self._response_queue.put(line)
 
     def _on_message_push(self, message: str):
         """Handle a Kanata push message."""
         if message.startswith("DEBUG:"):
-            log.debug(f"KanataDebug: {message[len('DEBUG:') :]}")
+            log.debug("KanataDebug: %s", message[len("DEBUG:") :])
             return
         if message.startswith("APP:"):
             app_name = message[len("APP:") :].strip()
@@ -823,51 +1057,175 @@ class KanataClient:
 
         log.info("KanataMsg: %s", message)
 
-    def send(self, cmd: dict) -> str | None:
+    def send(self, cmd: dict | bytes, expect: str | None = None) -> str | None:
         """
         Send a JSON command to Kanata and return the response.
 
+        cmd is either a dict, or an already encoded newline-terminated JSON
+        line (see KANATA_REQUEST_* constants), sent without re-serializing.
+        If expect is given, queued lines not carrying that key (e.g. late
+        replies to fire-and-forget commands) are skipped while waiting.
+
         The background reader thread continuously reads from the socket and
         routes MessagePush messages to _on_message_push(), while command
         responses are placed on _response_queue for this method to consume.
         """
+        replies = self._exchange([cmd], [expect])
+        return replies[0] if replies else None
+
+    def send_nowait(self, cmd: dict | bytes) -> bool:
+        """Send a JSON command to Kanata without waiting for its response.
+
+        Returns False if it was dropped (Kanata can't be reached).
+        """
+        return self._exchange([cmd], None) is not None
+
+    def send_many(
+        self, cmds: list[dict | bytes], wait_reply: bool = True
+    ) -> list[str | None]:
+        """
+        Send several JSON commands to Kanata in a single write and return
+        their responses, in the same order.
+
+        Kanata handles the newline-delimited commands one after the other, so
+        this saves one write (and one wakeup of Kanata) per extra command.
+
+        With wait_reply=False nothing is read back and an empty list is
+        returned; any replies left on the queue are discarded by the next
+        send (see _drain_responses).
+        """
+        if not cmds:
+            return []
+        replies = self._exchange(cmds, [None] * len(cmds) if wait_reply else None)
+        if replies is None:
+            return [None] * len(cmds) if wait_reply else []
+        return replies
+
+    def _exchange(
+        self, cmds: list[dict | bytes], expects: list[str | None] | None
+    ) -> list[str | None] | None:
+        """Write cmds and, unless expects is None, wait for one reply per
+        command (see send for the meaning of each expect).
+
+        While Kanata can't be reached (connection lost, Kanata restarting)
+        the commands are dropped and None is returned. The reconnect
+        callback is there to re-apply whatever state is still relevant.
+        """
         if not self._connected:
-            self._connect()
-        log.debug("KWanata: Sending command: %s", cmd)
-        msg = json.dumps(cmd) + "\n"
+            # Only the first connection is made lazily from here. Once lost,
+            # the _reconnect timer alone retries (each attempt can block the
+            # main loop for up to CONNECT_TIMEOUT), and sends are dropped.
+            if self._client is not None or not self._connect():
+                log.warning("Not connected to Kanata, dropping commands: %s", cmds)
+                return None
+        try:
+            with self._send_lock:
+                self._write(cmds)
+                if expects is None:
+                    return []
+                return [
+                    self._wait_response(cmd, expect)
+                    for cmd, expect in zip(cmds, expects)
+                ]
+        except OSError as e:
+            log.warning("Lost connection to Kanata: %s", e)
+            self._connection_lost()
+            return None
+
+    def _write(self, cmds: list[dict | bytes]) -> None:
+        """Write cmds with a single sendall. Must be called with _send_lock held."""
+        log.debug("KWanata: Sending commands: %s", cmds)
+        msg = b"".join(self._encode(cmd) for cmd in cmds)
+        self._drain_responses()
+        self._client.sendall(msg)
 
-        with self._send_lock:
-            self._client.sendall(msg.encode("utf-8"))
+    @staticmethod
+    def _encode(cmd: dict | bytes) -> bytes:
+        if isinstance(cmd, bytes):
+            return cmd
+        return json_dumps(cmd) + b"\n"
+
+    def _wait_response(
+        self, cmd: dict | bytes, expect: str | None = None
+    ) -> str | None:
+        deadline = time.monotonic() + self.RESPONSE_TIMEOUT
+        while True:
             try:
-                return self._response_queue.get(timeout=2)
+                line = self._response_queue.get(
+                    timeout=max(0.0, deadline - time.monotonic())
+                )
             except Empty:
                 log.warning("Timeout waiting for Kanata response to: %s", cmd)
                 return None
+            if expect is None or f'"{expect}"' in line:
+                return line
+            log.debug("Skipping unrelated Kanata response: %s", line)
+
+    def _drain_responses(self) -> None:
+        """Discard stale responses (e.g. a late reply to a command that timed
+        out) so they aren't taken as the reply to the next command.
+
+        Non-blocking: returns immediately when the queue is empty."""
+        while True:
+            try:
+                line = self._response_queue.get_nowait()
+            except Empty:
+                return
+            log.debug("Discarding stale Kanata response: %s", line)
 
     def get_current_layer_name(self) -> str:
-        data = self._parse_json_response(self.send({"RequestCurrentLayerName": {}}))
+        response = self.send(KANATA_REQUEST_CURRENT_LAYER_NAME, "CurrentLayerName")
+        data = self._parse_json_response(response)
         return data.get("CurrentLayerName", {}).get("name")
 
     def get_current_layer_info(self) -> dict[str, str] | None:
-        data = self._parse_json_response(self.send({"RequestCurrentLayerInfo": {}}))
+        response = self.send(KANATA_REQUEST_CURRENT_LAYER_INFO, "CurrentLayerInfo")
+        data = self._parse_json_response(response)
         return data.get("CurrentLayerInfo")
 
     def get_layer_names(self) -> list[str]:
-        data = self._parse_json_response(self.send({"RequestLayerNames": {}}))
+        response = self.send(KANATA_REQUEST_LAYER_NAMES, "LayerNames")
+        data = self._parse_json_response(response)
         return data.get("LayerNames", {}).get("names")
 
     def change_layer(self, layer: str) -> bool:
-        if layer == self.get_current_layer_name():
+        # current_layer is tracked locally (seeded on connect, then updated by
+        # our own ChangeLayer commands and Kanata's LayerChange pushes), so
+        # there's no need for a RequestCurrentLayerName round-trip here.
+        if layer == self.current_layer:
             log.debug("Layer '%s' is already active.", layer)
             return False
-        self._parse_json_response(self.send({"ChangeLayer": {"new": layer}}))
+        cmd = self._change_layer_cmds.get(layer)
+        if cmd is None:
+            cmd = self._encode({"ChangeLayer": {"new": layer}})
+            self._change_layer_cmds[layer] = cmd
+        # Fire-and-forget: the reply is of no use (current_layer is set here
+        # and kept in sync by LayerChange pushes).
+        if not self.send_nowait(cmd):
+            return False
+        self.current_layer = layer
         log.info("Switched to layer '%s'", layer)
         return True
 
     def act_on_fake_key(self, fake_key: tuple[str, str]) -> None:
-        name, action = utils.validate_fake_key(fake_key, rule_no=None)
-        self._parse_json_response(
-            self.send({"ActOnFakeKey": {"name": name, "action": action}})
+        self.act_on_fake_keys([utils.validate_fake_key(fake_key, rule_no=None)])
+
+    def act_on_fake_keys(self, fake_keys: list[tuple[str, str]]) -> None:
+        """Act on several virtual keys, in order, with a single send.
+
+        fake_keys must already be valid (see utils.validate_fake_key): the
+        names come from rules validated at config load and the actions are
+        constants, so nothing is re-checked per focus change.
+
+        Fire-and-forget: the replies carry nothing we use, so there's no
+        point in blocking the DBus handler until they arrive.
+        """
+        self.send_many(
+            [
+                {"ActOnFakeKey": {"name": name, "action": action}}
+                for name, action in fake_keys
+            ],
+            wait_reply=False,
         )
 
     def set_mouse(self, pos: tuple[int, int]) -> None:
@@ -878,12 +1236,12 @@ class KanataClient:
         This method exists as a placeholder for future support.
         """
         x, y = pos
-        self._parse_json_response(self.send({"SetMouse": {"x": x, "y": y}}))
+        self.send_nowait({"SetMouse": {"x": x, "y": y}})
 
     def _parse_json_response(self, response: str | None) -> dict[str, Any]:
         if response:
             try:
-                return json.loads(response)
+                return json_loads(response)
             except json.JSONDecodeError:
                 return {}
         return {}
@@ -896,58 +1254,240 @@ class AppMatcher:
     """Matches apps rules with incoming dbus msg"""
 
     def __init__(self, filepath):
-        self._apps_rules = []
+        # find_match only depends on its arguments while the rules don't
+        # change, so it's memoized (repeated focus on the same windows skips
+        # the rule walk). load_app_rules() clears the cache, so it must run on
+        # the thread calling find_match (the main loop): a lookup still in
+        # flight on the old rules could otherwise cache a stale result.
+        self.find_match = functools.lru_cache(maxsize=256)(self._find_match_impl)
         self.load_app_rules(filepath)
 
     def load_app_rules(self, filepath):
         """Load and pre-compile regex rules from a TOML file.
 
-        Clears any previously loaded rules before loading, so this method
-        can be called again to reload the config.
+        Replaces any previously loaded rules, so this method can be called
+        again to reload the config.
         """
-        self._apps_rules = []
+        apps_rules = []
         try:
-            with open(filepath, "rb") as f:
-                data = tomllib.load(f)
-                for entry in data.get(SECTION_APP, []):
-                    # Pre-compiling regex for better performance during matching
-                    rule = {
-                        FIELD_NAME: re.compile(entry[FIELD_NAME])
-                        if FIELD_NAME in entry
-                        else MATCH_ALL_RE,
-                        FIELD_CLASS: re.compile(entry[FIELD_CLASS])
-                        if FIELD_CLASS in entry
-                        else MATCH_ALL_RE,
-                        FIELD_CAPTION: re.compile(entry[FIELD_CAPTION])
-                        if FIELD_CAPTION in entry
-                        else MATCH_ALL_RE,
-                        FIELD_VK: entry.get(FIELD_VK, []),
-                        FIELD_LAYER: entry.get(FIELD_LAYER),
-                    }
-                    self._apps_rules.append(rule)
-                    log.debug(f"Loaded rule: {rule}")
-            log.info(f"Loaded {len(self._apps_rules)} rules from {filepath}")
+            data = utils.load_toml(filepath)
+            for rule_no, entry in enumerate(data.get(SECTION_APP, []), start=1):
+                # Pre-compiling regex for better performance during matching.
+                # Each field is stored as (pattern, required literal), or
+                # None when omitted, acting as a wildcard.
+                virtual_keys = self._load_virtual_keys(entry, rule_no)
+                if virtual_keys is None:
+                    continue
+                rule = {
+                    FIELD_NAME: self._compile_field(entry.get(FIELD_NAME)),
+                    FIELD_CLASS: self._compile_field(entry.get(FIELD_CLASS)),
+                    FIELD_CAPTION: self._compile_field(entry.get(FIELD_CAPTION)),
+                    FIELD_VK: virtual_keys,
+                    FIELD_LAYER: entry.get(FIELD_LAYER),
+                }
+                apps_rules.append(rule)
+                log.debug(f"Loaded rule: {rule}")
+            log.info(f"Loaded {len(apps_rules)} rules from {filepath}")
         except (OSError, tomllib.TOMLDecodeError, re.error) as e:
             log.info(f"Failed to load config file: {filepath} {e}. Running dry.")
+        # Rows and re2 sets are published together in a single assignment, so
+        # find_match never sees the rows of one config with the sets of another.
+        self._compiled = (
+            self._build_rows(apps_rules),
+            self._build_re2_sets(apps_rules),
+        )
+        self.find_match.cache_clear()
+
+    def _build_rows(self, apps_rules: list[dict]) -> tuple:
+        """Flatten the loaded rules into a tuple of
+        (name, class, caption, layer, virtual_keys) tuples, so find_match
+        unpacks each rule positionally instead of doing dict lookups.
+
+        Each field is stored as (required literal, bound pattern.search), or
+        None for a wildcard, so no attribute lookup is left in the loop.
+        Plain-substring fields get no search at all: (substring, None).
+        """
+        return tuple(
+            (
+                self._row_field(rule[FIELD_NAME]),
+                self._row_field(rule[FIELD_CLASS]),
+                self._row_field(rule[FIELD_CAPTION]),
+                rule[FIELD_LAYER],
+                rule[FIELD_VK],
+            )
+            for rule in apps_rules
+        )
 
-    def find_match(
+    @staticmethod
+    def _row_field(field: tuple[re.Pattern, str] | None):
+        if field is None:
+            return None
+        pattern, literal = field
+        if REGEX_METACHARS.isdisjoint(pattern.pattern):
+            # Plain substring (e.g. class = "firefox"): no regex needed.
+            return (pattern.pattern, None)
+        return (literal, pattern.search)
+
+    def _build_re2_sets(self, apps_rules: list[dict]) -> tuple | None:
+        """With re2 installed, compile each field's patterns (of all rules)
+        into a single re2.Set, so find_match scans each window field once
+        and gets back every rule whose pattern matches it.
+
+        Returns None (per-rule loop) if re2 isn't installed, or if any of the
+        patterns had to be compiled with re (see _compile_regex): a set would
+        match those with re2 semantics anyway.
+        """
+        fields = (FIELD_NAME, FIELD_CLASS, FIELD_CAPTION)
+        if re2 is None or not apps_rules:
+            return None
+        for rule in apps_rules:
+            for field in fields:
+                if rule[field] is not None and isinstance(rule[field][0], re.Pattern):
+                    log.debug(
+                        "Not using re2 sets for rule matching: '%s' needs re",
+                        rule[field][0].pattern,
+                    )
+                    return None
+        try:
+            return tuple(self._build_re2_set(apps_rules, field) for field in fields)
+        except re2.error as e:
+            log.debug("Not using re2 sets for rule matching: %s", e)
+            return None
+
+    @staticmethod
+    def _build_re2_set(apps_rules: list[dict], field: str):
+        """Return (re2.Set or None, rule index per set entry, wildcard rules)."""
+        re_set = re2.Set.SearchSet()
+        ids, wildcards = [], []
+        for i, rule in enumerate(apps_rules):
+            if rule[field] is None:
+                wildcards.append(i)
+                continue
+            pattern, _ = rule[field]
+            re_set.Add(pattern.pattern)
+            ids.append(i)
+        if not ids:
+            return (None, (), frozenset(wildcards))
+        re_set.Compile()
+        return (re_set, tuple(ids), frozenset(wildcards))
+
+    @staticmethod
+    def _load_virtual_keys(entry, rule_no: int) -> list[str] | None:
+        """Validate (once, here) and intern the virtual key names of a rule,
+        so they can be sent to Kanata as is on every focus change.
+
+        Returns None if any name is invalid, so the rule is skipped. This also
+        runs on RELOAD, where a bad rule must not take down the running
+        service, so it must never exit.
+        """
+        names = entry.get(FIELD_VK, [])
+        if not isinstance(names, list):
+            log.warning(
+                "Invalid config: rule #%d '%s' must be a list, skipping",
+                rule_no,
+                FIELD_VK,
+            )
+            return None
+        virtual_keys = []
+        for vk in names:
+            if not isinstance(vk, str) or utils.is_blank(vk):
+                log.warning(
+                    "Invalid config: rule #%d has invalid virtual key %r, skipping",
+                    rule_no,
+                    vk,
+                )
+                return None
+            virtual_keys.append(sys.intern(vk))
+        return virtual_keys
+
+    @staticmethod
+    def _compile_field(pattern: str | None) -> tuple[re.Pattern, str] | None:
+        """Compile a rule field into (pattern, required literal).
+
+        Omitted fields stay None, so find_match never runs a regex for them.
+        """
+        if pattern is None:
+            return None
+        return (AppMatcher._compile_regex(pattern), utils.required_literal(pattern))
+
+    @staticmethod
+    def _compile_regex(pattern: str):
+        """Compile with re2 if available, else (or if re2 rejects it) with re.
+
+        re2 doesn't support backreferences or lookarounds, so those patterns
+        keep working through the stdlib engine. Patterns using \\w, \\d, \\b,
+        \\s (or their negations) also stay on re: re2 would match them
+        against ASCII only, e.g. \\w would no longer match "ü" in a caption.
+        """
+        if re2 is not None and not UNICODE_CLASS_RE.search(pattern):
+            try:
+                return re2.compile(pattern)
+            except re2.error:
+                log.debug("re2 can't compile '%s', using re", pattern)
+        return re.compile(pattern)
+
+    @staticmethod
+    def _field_matches(field: tuple[str, Callable | None], value: str) -> bool:
+        literal, search = field
+        if search is None:
+            return literal in value
+        # Substring test is far cheaper than a regex search, and rejects
+        # most non-matching rules before the regex engine is involved.
+        if literal and literal not in value:
+            return False
+        return search(value) is not None
+
+    def _find_match_impl(
         self, win_name, win_class, win_caption
     ) -> tuple[str | None, str | None]:
         """Return (layer, virtual_keys) for the first matching rule.
 
+        Called through the memoized self.find_match.
+
         Rules are checked in config.toml order — first match wins.
-        All specified fields must match (AND logic); omitted fields default
-        to MATCH_ALL_RE so they always pass.
+        All specified fields must match (AND logic); omitted fields are None
+        so they always pass.
         """
-        for app_rule in self._apps_rules:
-            match_name = app_rule[FIELD_NAME].search(win_name)
-            match_class = app_rule[FIELD_CLASS].search(win_class)
-            match_caption = app_rule[FIELD_CAPTION].search(win_caption)
+        # One snapshot of both, in case a reload publishes new ones meanwhile.
+        rules, re2_sets = self._compiled
+        if re2_sets is not None:
+            return self._find_match_re2(
+                rules, re2_sets, win_name, win_class, win_caption
+            )
 
-            if match_name and match_class and match_caption:
-                return (app_rule[FIELD_LAYER], app_rule[FIELD_VK])
+        # Bound once to a local: the loop body then only does LOAD_FAST lookups.
+        field_matches = self._field_matches
+        for r_name, r_class, r_caption, r_layer, r_vks in rules:
+            if (
+                (r_name is None or field_matches(r_name, win_name))
+                and (r_class is None or field_matches(r_class, win_class))
+                and (r_caption is None or field_matches(r_caption, win_caption))
+            ):
+                return (r_layer, r_vks)
         return (None, None)
 
+    @staticmethod
+    def _find_match_re2(
+        rules, re2_sets, win_name, win_class, win_caption
+    ) -> tuple[str | None, str | None]:
+        """find_match through the per-field re2 sets: candidate rules are
+        those matched (or wildcarded) on every field, and the first of them
+        in config order wins."""
+        candidates = None
+        for (re_set, ids, wildcards), value in zip(
+            re2_sets, (win_name, win_class, win_caption)
+        ):
+            hits = wildcards
+            if re_set is not None:
+                matched = re_set.Match(value)
+                if matched:
+                    hits = hits.union([ids[j] for j in matched])
+            candidates = hits if candidates is None else candidates & hits
+            if not candidates:
+                return (None, None)
+        _, _, _, layer, virtual_keys = rules[min(candidates)]
+        return (layer, virtual_keys)
+
 
 # ----------------------------
 # KWanata D-Bus service
@@ -977,6 +1517,10 @@ class KWanataService:
     </node>
     """
 
+    # KWin fires bursts of focus/caption events when switching windows;
+    # only the last event of a burst within this window (ms) is handled.
+    NOTIFY_DEBOUNCE_MS = 15
+
     def __init__(self, kanata_client, app_matcher: AppMatcher, default_layer: str):
         self._kanata_client = kanata_client
         self._last_virtual_keys = []
@@ -984,11 +1528,40 @@ class KWanataService:
         self._last_layer = None
         self._app_matcher = app_matcher
         self._app_runner = None
+        # Latest focus/caption message waiting for the debounce timeout (see
+        # NOTIFY_DEBOUNCE_MS), and the GLib source id of that timeout (0: none).
+        self._pending_msg = None
+        self._pending_source = 0
+        # Last dbus message and (name, class, caption) handled, to drop repeats
+        # (KWin often sends captionChanged and focusChanged for the same window
+        # back to back).
+        self._last_msg = None
+        self._last_window = None
 
     def set_app_runner(self, app_runner):
         """Set the AppRunner instance to receive raise results."""
         self._app_runner = app_runner
 
+    def clear_match_cache(self):
+        """Forget the last handled window, so it's matched again against the
+        new rules. Must be called after reloading the rules."""
+        self._last_msg = None
+        self._last_window = None
+
+    def resync(self):
+        """Re-apply the focused window's layer and virtual keys, after Kanata
+        restarted (back on its startup layer, with no virtual keys pressed).
+        Run from the main loop (GLib.idle_add), returns GLib.SOURCE_REMOVE."""
+        dbus_msg = self._last_msg
+        self.clear_match_cache()
+        # Nothing pressed anymore, and a layer that differs from anything
+        # matched, so the focused window's layer is always sent again.
+        self._last_virtual_keys = []
+        self._last_layer = object()
+        if dbus_msg is not None:
+            self._notifyKanata(dbus_msg)
+        return GLib.SOURCE_REMOVE
+
     def get_help_file_path(self, help_dir: str, keys: str | None = None) -> str | None:
         """Derive the help file path from the current active app and either
         the given keys or the current Kanata layer.
@@ -1049,11 +1622,15 @@ class KWanataService:
         Tracks previous layer and virtual keys to avoid sending redundant
         commands (e.g. rapid focus events between windows of the same app).
         """
+        if dbus_msg == self._last_msg:
+            return
+        self._last_msg = dbus_msg
         info = utils.parse_dbus_msg(dbus_msg)
-
-        layer, virtual_keys = self._app_matcher.find_match(
-            info[FIELD_NAME], info[FIELD_CLASS], info[FIELD_CAPTION]
-        )
+        window = (info[FIELD_NAME], info[FIELD_CLASS], info[FIELD_CAPTION])
+        if window == self._last_window:
+            return
+        self._last_window = window
+        layer, virtual_keys = self._app_matcher.find_match(*window)
 
         # Only switch layer if different from the last one sent.
         if layer != self._last_layer:
@@ -1063,17 +1640,15 @@ class KWanataService:
         # Release old virtual keys before pressing new ones, so Kanata
         # sees a clean transition (no overlapping key states).
         if virtual_keys != self._last_virtual_keys:
-            log.debug("KWin: New window detected..." + dbus_msg)
-            if self._last_virtual_keys:
-                for vk in self._last_virtual_keys:
-                    self._kanata_client.act_on_fake_key((vk, "Release"))
-            if virtual_keys:
-                for vk in virtual_keys:
-                    self._kanata_client.act_on_fake_key((vk, "Press"))
+            log.debug("KWin: New window detected...%s", dbus_msg)
+            # Both transitions go out in one batch, releases first.
+            fake_keys = [(vk, "Release") for vk in self._last_virtual_keys or []]
+            fake_keys += [(vk, "Press") for vk in virtual_keys or []]
+            self._kanata_client.act_on_fake_keys(fake_keys)
             self._last_virtual_keys = virtual_keys
 
     def debug(self, dbus_msg):
-        log.debug("KWin-KWanata: " + dbus_msg)
+        log.debug("KWin-KWanata: %s", dbus_msg)
 
     def notifyRaiseResult(self, dbus_msg):
         info = utils.parse_dbus_msg(dbus_msg)
@@ -1088,10 +1663,26 @@ class KWanataService:
             self._app_runner.on_raise_result(success)
 
     def notifyCaptionChanged(self, dbus_msg):
-        self._notifyKanata(dbus_msg)
+        self._queue_notify(dbus_msg)
 
     def notifyFocusChanged(self, dbus_msg):
+        self._queue_notify(dbus_msg)
+
+    def _queue_notify(self, dbus_msg):
+        """Debounce: keep only the latest message and handle it once the
+        burst it belongs to is over."""
+        self._pending_msg = dbus_msg
+        if not self._pending_source:
+            self._pending_source = GLib.timeout_add(
+                self.NOTIFY_DEBOUNCE_MS, self._flush_pending
+            )
+
+    def _flush_pending(self):
+        dbus_msg = self._pending_msg
+        self._pending_msg = None
+        self._pending_source = 0
         self._notifyKanata(dbus_msg)
+        return GLib.SOURCE_REMOVE
 
 
 # ----------------------------
@@ -1159,10 +1750,18 @@ def main():
     def reload_config():
         log.info("Reloading config from %s", args.config)
         app_matcher.load_app_rules(args.config)
+        service.clear_match_cache()
         app_runner.load_config(args.config)
+        return GLib.SOURCE_REMOVE
 
-    kanata.set_reload_callback(reload_config)
+    # RELOAD arrives on the Kanata reader thread; the reload itself runs on
+    # the main loop, so it can't interleave with find_match (and its cache)
+    # running for a DBus event.
+    kanata.set_reload_callback(lambda: GLib.idle_add(reload_config))
     kanata.set_set_callback(variables.apply_set)
+    # Deferred to its own main loop iteration: it sends to Kanata itself, and
+    # is called while the client is still finishing the reconnection.
+    kanata.set_reconnect_callback(lambda: GLib.idle_add(service.resync))
     kanata.set_unset_callback(variables.apply_unset)
 
     service = KWanataService(kanata, app_matcher, args.default_layer)
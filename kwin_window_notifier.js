@@ -38,7 +38,7 @@ function debug(msg) {
 //   method -- Method for the callDBus call.
 //   window -- Window to get the info from.
 // Build a "key: value" text block from window properties. The Python service
-// parses this with DBUS_MSG_FIELD_RE to extract name/class/caption for rule
+// parses this with utils.parse_dbus_msg to extract name/class/caption for rule
 // matching.
 function sendWindowData(method, window) {
     let msg = `